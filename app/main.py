@@ -17,8 +17,11 @@ if project_root not in sys.path:
 # ------------------------------------
 
 # --- Import from our project modules ---
-from nlp.preprocessing import get_sentences
-from nlp.aspect_extractor import extract_aspect, ASPECT_KEYWORDS
+from nlp.preprocessing import get_sentence_spans
+from nlp.aspect_extractor import extract_aspect
+from nlp.deduplication import deduplicate_text
+from nlp.results import AnalysisResults
+from nlp.taxonomy import get_taxonomy, refresh_if_changed
 from sentiment.sentiment_model import get_sentiment_pipeline, get_sentiment
 # ---------------------------------------
 
@@ -33,35 +36,42 @@ def load_sentiment_model():
 def run_analysis(raw_text):
     """
     Runs the full NLP pipeline on a block of raw text.
+    Returns an AnalysisResults container, or None if the model failed to load.
     """
-    sentences = get_sentences(raw_text)
-    results = []
+    text = deduplicate_text(raw_text)
+    results = AnalysisResults(text, get_taxonomy().aspects)
     
     sentiment_pipeline = load_sentiment_model()
     if not sentiment_pipeline:
         st.error("Failed to load sentiment model. Please check the logs.")
-        return pd.DataFrame()
+        return None
 
-    for sentence in sentences:
+    for start, end in get_sentence_spans(text):
+        sentence = text[start:end]
         aspect = extract_aspect(sentence)
         if aspect != 'Unclassified':
             polarity = get_sentiment(sentence, sentiment_pipeline)
-            results.append({
-                'Sentence': sentence,
-                'Aspect': aspect,
-                'Polarity': polarity
-            })
+            results.append(start, end, aspect, polarity)
             
-    return pd.DataFrame(results)
+    return results
+
+def results_frame(results):
+    """Wraps the result columns in a DataFrame, without the sentence text."""
+    return results.to_pandas().rename(columns=str.capitalize)
+
+def feed_frame(results):
+    """Builds the displayed raw feed: sentence text instead of offsets."""
+    frame = results.to_pandas(sentences=True)[['sentence', 'aspect', 'polarity']]
+    return frame.rename(columns=str.capitalize)
 
 # --- Visualization Functions ---
 def create_radar_chart(df1, df2, brand1_name, brand2_name):
     """Creates a competitive radar chart."""
-    aspects = list(ASPECT_KEYWORDS.keys())
+    aspects = list(get_taxonomy().aspects)
     
     # Calculate average polarity for each aspect
-    avg_polarity1 = df1.groupby('Aspect')['Polarity'].mean().reindex(aspects, fill_value=0)
-    avg_polarity2 = df2.groupby('Aspect')['Polarity'].mean().reindex(aspects, fill_value=0)
+    avg_polarity1 = df1.groupby('Aspect', observed=True)['Polarity'].mean().reindex(aspects, fill_value=0)
+    avg_polarity2 = df2.groupby('Aspect', observed=True)['Polarity'].mean().reindex(aspects, fill_value=0)
     
     fig = go.Figure()
 
@@ -89,9 +99,13 @@ def create_radar_chart(df1, df2, brand1_name, brand2_name):
     )
     return fig
 
-def create_word_cloud(df, aspect):
+def create_word_cloud(results, aspect):
     """Generates a word cloud for negative sentences of a specific aspect."""
-    text = ' '.join(df[(df['Aspect'] == aspect) & (df['Polarity'] < -0.5)]['Sentence'])
+    if aspect not in results.aspects:
+        return None
+    # Only the sentences that go into the cloud are sliced out of the text
+    selected = (results.aspect_codes == results.aspects.index(aspect)) & (results.polarity < -0.5)
+    text = ' '.join(results.sentence(i) for i in np.flatnonzero(selected))
     
     if not text:
         return None
@@ -104,6 +118,7 @@ def create_word_cloud(df, aspect):
 
 # --- Streamlit UI ---
 st.set_page_config(layout="wide")
+refresh_if_changed()  # Streamlit reruns this script on every interaction
 st.title("🚀 Aspect-Pulse: Competitive Benchmarking Hub")
 
 st.sidebar.header("Controls")
@@ -130,13 +145,15 @@ if st.sidebar.button("Analyze"):
         st.sidebar.warning("Please paste reviews for both brands.")
     else:
         with st.spinner("Analyzing... This may take a moment."):
-            df_a = run_analysis(text_a)
-            df_b = run_analysis(text_b)
+            results_a = run_analysis(text_a)
+            results_b = run_analysis(text_b)
 
-        if df_a.empty or df_b.empty:
+        if not results_a or not results_b:
             st.error("Analysis failed or no aspects were identified. Please try different text.")
         else:
             st.header("Analysis Results")
+            df_a = results_frame(results_a)
+            df_b = results_frame(results_b)
             
             # --- Radar Chart ---
             st.subheader("📊 Competitive Radar Chart")
@@ -149,12 +166,12 @@ if st.sidebar.button("Analyze"):
             st.subheader("☁️ Pain-Point Word Clouds")
             st.write("These word clouds highlight common terms in strongly negative reviews for each aspect.")
             
-            selected_aspect = st.selectbox("Select an aspect to view word clouds:", list(ASPECT_KEYWORDS.keys()))
+            selected_aspect = st.selectbox("Select an aspect to view word clouds:", list(get_taxonomy().aspects))
             
             wc_col1, wc_col2 = st.columns(2)
             with wc_col1:
                 st.write(f"**{brand_a_name} - Negative '{selected_aspect}' Cloud**")
-                wc_fig_a = create_word_cloud(df_a, selected_aspect)
+                wc_fig_a = create_word_cloud(results_a, selected_aspect)
                 if wc_fig_a:
                     st.pyplot(wc_fig_a)
                 else:
@@ -162,7 +179,7 @@ if st.sidebar.button("Analyze"):
 
             with wc_col2:
                 st.write(f"**{brand_b_name} - Negative '{selected_aspect}' Cloud**")
-                wc_fig_b = create_word_cloud(df_b, selected_aspect)
+                wc_fig_b = create_word_cloud(results_b, selected_aspect)
                 if wc_fig_b:
                     st.pyplot(wc_fig_b)
                 else:
@@ -175,7 +192,7 @@ if st.sidebar.button("Analyze"):
             st.write("Here is the processed data used for the visualizations.")
             
             st.write(f"**{brand_a_name} - Processed Data**")
-            st.dataframe(df_a)
+            st.dataframe(feed_frame(results_a))
             
             st.write(f"**{brand_b_name} - Processed Data**")
-            st.dataframe(df_b)
+            st.dataframe(feed_frame(results_b))
@@ -1,53 +1,78 @@
+import threading
+from collections import OrderedDict
+
 import spacy
 from .preprocessing import nlp # Import the loaded SpaCy model
+from .taxonomy import get_taxonomy, register_reload_callback
+
+# Aspect keywords live in per-category taxonomy files, see nlp/taxonomy.py.
+
+# --- Aspect Cache ---
+# Results are keyed on the taxonomy version, so a taxonomy reload never serves
+# an aspect computed from the old keywords.
+ASPECT_CACHE_SIZE = 10000
+_aspect_cache = OrderedDict()
+_aspect_cache_lock = threading.Lock()
+
+def _invalidate_aspect_cache(taxonomies):
+    """Drops cache entries computed with a taxonomy version that is no longer active."""
+    active_versions = {taxonomy.version for taxonomy in taxonomies.values()}
+    with _aspect_cache_lock:
+        for key in [key for key in _aspect_cache if key[0] not in active_versions]:
+            del _aspect_cache[key]
 
-# --- Define Aspect Keywords ---
-# This dictionary maps aspects to a list of related keywords.
-ASPECT_KEYWORDS = {
-    'Battery': ['battery', 'charging', 'power', 'mah', 'charger', 'lasts', 'charge'],
-    'Camera': ['camera', 'photo', 'picture', 'video', 'lens', 'zoom', 'selfie', 'portraits'],
-    'Display': ['display', 'screen', 'oled', 'amoled', 'refresh rate', 'brightness', 'pixels'],
-    'Performance': ['performance', 'speed', 'fast', 'slow', 'lag', 'smooth', 'processor', 'ram', 'gaming'],
-    'Value': ['price', 'value', 'cheap', 'expensive', 'cost', 'worth', 'budget']
-}
-# -----------------------------
+register_reload_callback(_invalidate_aspect_cache)
+# --------------------
 
-def extract_aspect(sentence):
+def extract_aspect(sentence, category=None):
     """
     Extracts the primary aspect from a sentence using a rule-based approach.
     
     Args:
         sentence (str): The input sentence to analyze.
+        category (str): The product category whose taxonomy to use.
+                        Defaults to the default category.
         
     Returns:
         str: The identified aspect, or 'Unclassified' if no aspect is found.
     """
+    taxonomy = get_taxonomy(category)
+    key = (taxonomy.version, sentence)
+    with _aspect_cache_lock:
+        if key in _aspect_cache:
+            _aspect_cache.move_to_end(key)
+            return _aspect_cache[key]
+
+    aspect = _extract_aspect(sentence, taxonomy)
+
+    with _aspect_cache_lock:
+        _aspect_cache[key] = aspect
+        if len(_aspect_cache) > ASPECT_CACHE_SIZE:
+            _aspect_cache.popitem(last=False)
+    return aspect
+
+def _extract_aspect(sentence, taxonomy):
     sentence_lower = sentence.lower()
-    doc = nlp(sentence_lower)
-    
-    found_aspects = set()
     
     # 1. Direct Keyword Matching
-    for aspect, keywords in ASPECT_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in sentence_lower:
-                found_aspects.add(aspect)
+    found_aspects = taxonomy.match(sentence_lower)
 
     # 2. Dependency Parsing for Refinement
     # If multiple aspects are found, we try to find the most likely one.
     # We prioritize nouns that are subjects of the sentence.
     if len(found_aspects) > 1:
+        doc = nlp(sentence_lower)
         for token in doc:
             # Check if the token is a noun subject (nsubj)
             if token.dep_ == 'nsubj':
-                for aspect, keywords in ASPECT_KEYWORDS.items():
-                    if token.lemma_ in keywords:
-                        # If a subject matches a keyword, we consider it the primary aspect
-                        return aspect
+                aspect = taxonomy.lemma_table.get(token.lemma_)
+                if aspect:
+                    # If a subject matches a keyword, we consider it the primary aspect
+                    return aspect
 
     # If only one aspect was found, or refinement didn't work, return the first one found.
     if found_aspects:
-        return list(found_aspects)[0]
+        return found_aspects[0]
         
     return 'Unclassified'
 
@@ -0,0 +1,297 @@
+"""
+Near-duplicate and spam review removal using MinHash signatures and LSH.
+
+Scraped reviews and comments contain a lot of copy-paste, bot spam and
+quote-replies. This stage runs between the scrapers and the analysis and
+drops duplicates, so they do not inflate the aspect counts. It works in a
+single streaming pass and only remembers a bounded number of recent
+documents, so memory stays flat on large scrapes.
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- MinHash / LSH parameters ---
+# 16 bands of 8 rows make two texts likely candidates from roughly 70%
+# shingle overlap; candidates are then checked against SIMILARITY_THRESHOLD.
+NUM_PERM = 128
+NUM_BANDS = 16
+SHINGLE_SIZE = 3  # words per shingle
+SIMILARITY_THRESHOLD = 0.8
+# Documents remembered for comparison. Each one costs about 2 KB (signature
+# plus index entries), so the default caps memory near 100 MB.
+MAX_DOCUMENTS = 50000
+# Texts signed per NumPy batch in `signatures`; bounds the temporary
+# num_perm x shingles matrix to a few tens of MB.
+SIGNATURE_BATCH = 256
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+# --------------------------------
+
+_QUOTE_LINE = re.compile(r'^\s*(>|&gt;).*$', re.MULTILINE)
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def strip_quotes(text):
+    """
+    Removes quoted lines (Reddit's '> ...' replies) from a comment.
+
+    Args:
+        text (str): The comment text.
+
+    Returns:
+        str: The text without quoted lines.
+    """
+    return _QUOTE_LINE.sub('', text).strip()
+
+
+def _normalize(text):
+    return _NON_WORD.sub(' ', text.lower()).split()
+
+
+class MinHashDeduplicator:
+    """
+    Streaming near-duplicate detector.
+
+    Call `check` once per text, in arrival order. The first text of a group
+    of near-duplicates is kept, the rest are reported as duplicates.
+    Statistics are kept per source (e.g. 'amazon', 'reddit').
+    """
+
+    def __init__(self, num_perm=NUM_PERM, num_bands=NUM_BANDS, threshold=SIMILARITY_THRESHOLD,
+                 shingle_size=SHINGLE_SIZE, max_documents=MAX_DOCUMENTS, seed=1):
+        if num_perm % num_bands != 0:
+            raise ValueError("num_perm must be a multiple of num_bands")
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_documents = max_documents
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=(num_perm, 1)).astype(np.uint64)
+        # Folds the rows of each band, plus the band number, into one integer
+        self._band_mix = rng.randint(1, 1 << 62, size=self.rows + 1, dtype=np.int64).astype(np.uint64)
+
+        # doc id -> (signature bytes, exact key); oldest first, evicted past max_documents
+        self._documents = OrderedDict()
+        # band key -> newest doc id in that bucket, and exact text hash -> doc id
+        self._buckets = {}
+        self._exact = {}
+        self._next_id = 0
+        self._stats = {}
+
+    def _shingle_hashes(self, text):
+        words = _normalize(text)
+        k = self.shingle_size
+        if len(words) >= k:
+            shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        else:
+            shingles = {' '.join(words)}
+
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return hashes % _MERSENNE_PRIME
+
+    def signature(self, text):
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): The text to sign.
+
+        Returns:
+            np.ndarray: uint32 array of length num_perm.
+        """
+        return self.signatures([text])[0]
+
+    def signatures(self, texts):
+        """
+        Computes the MinHash signatures of many texts with one NumPy pass per
+        batch, which is much faster than calling `signature` per text.
+
+        Args:
+            texts (iterable of str): The texts to sign.
+
+        Returns:
+            np.ndarray: uint32 array of shape (len(texts), num_perm).
+        """
+        hashes = [self._shingle_hashes(text) for text in texts]
+        result = np.empty((len(hashes), len(self._a)), dtype=np.uint32)
+        for begin in range(0, len(hashes), SIGNATURE_BATCH):
+            batch = hashes[begin:begin + SIGNATURE_BATCH]
+            # Every text has at least one shingle, so no slice is empty
+            offsets = np.cumsum([0] + [len(h) for h in batch[:-1]])
+            # a * h + b stays below 2**63, so the uint64 arithmetic never overflows
+            permuted = (self._a * np.concatenate(batch) + self._b) % _MERSENNE_PRIME
+            result[begin:begin + len(batch)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+    def _band_keys(self, signature):
+        # One integer per band; uint64 arithmetic wraps, which is fine for hashing
+        bands = signature.reshape(self.num_bands, self.rows).astype(np.uint64)
+        numbers = np.arange(self.num_bands, dtype=np.uint64)[:, None]
+        keys = np.hstack([bands, numbers]) * self._band_mix
+        return keys.sum(axis=1).tolist()
+
+    def _forget_oldest(self):
+        # Band keys are recomputed from the signature instead of being stored
+        doc_id, (signature, exact_key) = self._documents.popitem(last=False)
+        for key in self._band_keys(np.frombuffer(signature, dtype=np.uint32)):
+            if self._buckets.get(key) == doc_id:
+                del self._buckets[key]
+        if self._exact.get(exact_key) == doc_id:
+            del self._exact[exact_key]
+
+    def check(self, text, source='default', signature=None):
+        """
+        Checks one text against everything seen so far and remembers it.
+
+        Args:
+            text (str): The review or comment text.
+            source (str): Where the text came from, used for statistics.
+            signature (np.ndarray): The text's signature, if already computed
+                                    with `signatures`.
+
+        Returns:
+            bool: True if the text is a duplicate of an earlier one. Texts
+                  without any words are never duplicates and are not counted.
+        """
+        normalized = ' '.join(_normalize(text))
+        if not normalized:
+            return False
+
+        stats = self._stats.setdefault(source, {'seen': 0, 'duplicates': 0})
+        stats['seen'] += 1
+
+        exact_key = hash(normalized)
+        if exact_key in self._exact:
+            stats['duplicates'] += 1
+            return True
+
+        if signature is None:
+            signature = self.signature(text)
+        keys = self._band_keys(signature)
+        for key in keys:
+            doc_id = self._buckets.get(key)
+            if doc_id is None or doc_id not in self._documents:
+                continue
+            other = np.frombuffer(self._documents[doc_id][0], dtype=np.uint32)
+            if np.mean(signature == other) >= self.threshold:
+                stats['duplicates'] += 1
+                return True
+
+        doc_id = self._next_id
+        self._next_id += 1
+        self._documents[doc_id] = (signature.tobytes(), exact_key)
+        self._exact[exact_key] = doc_id
+        # Point each bucket at the newest document, so a bucket stays indexed
+        # until its most recent member is evicted
+        for key in keys:
+            self._buckets[key] = doc_id
+        if len(self._documents) > self.max_documents:
+            self._forget_oldest()
+        return False
+
+    def stats(self):
+        """
+        Returns deduplication statistics per source.
+
+        Returns:
+            dict: source -> {'seen', 'duplicates', 'dedup_ratio'}.
+        """
+        return {
+            source: dict(counts, dedup_ratio=counts['duplicates'] / counts['seen'] if counts['seen'] else 0.0)
+            for source, counts in self._stats.items()
+        }
+
+
+def deduplicate_reviews(df, text_column, source=None, source_column=None, quotes=True,
+                        deduplicator=None):
+    """
+    Removes near-duplicate rows of a scraped DataFrame.
+
+    Args:
+        df (pd.DataFrame): Scraped reviews, e.g. from extract_reviews or
+                           get_subreddit_comments.
+        text_column (str): Column holding the text ('review_text', 'body').
+        source (str): Source name for statistics, if the frame has one source.
+        source_column (str): Column holding the source name per row instead.
+        quotes (bool): Strip quoted reply lines from the text first.
+        deduplicator (MinHashDeduplicator): Reuse one across calls to dedupe
+                                            across batches and sources.
+
+    Returns:
+        pd.DataFrame: The deduplicated frame.
+    """
+    if df.empty:
+        return df
+    if deduplicator is None:
+        deduplicator = MinHashDeduplicator()
+
+    texts = df[text_column].fillna('').astype(str)
+    if quotes:
+        texts = texts.map(strip_quotes)
+    if source_column:
+        sources = df[source_column].astype(str)
+    else:
+        sources = [source or text_column] * len(df)
+
+    signatures = deduplicator.signatures(texts)
+    duplicate = np.fromiter(
+        (deduplicator.check(text, src, sig) for text, src, sig in zip(texts, sources, signatures)),
+        dtype=bool, count=len(df)
+    )
+
+    return df.assign(**{text_column: texts})[~duplicate]
+
+
+def deduplicate_text(raw_text, deduplicator=None, source='pasted'):
+    """
+    Drops repeated reviews from a block of pasted text, one review per line.
+
+    Args:
+        raw_text (str): The raw text.
+        deduplicator (MinHashDeduplicator): Optional shared deduplicator.
+        source (str): Source name for statistics.
+
+    Returns:
+        str: The text with duplicate lines removed.
+    """
+    if deduplicator is None:
+        deduplicator = MinHashDeduplicator()
+    kept = []
+    for line in raw_text.splitlines():
+        line = strip_quotes(line)
+        if line and not deduplicator.check(line, source):
+            kept.append(line)
+    return '\n'.join(kept)
+
+if __name__ == '__main__':
+    comments = pd.DataFrame({
+        'body': [
+            "The battery easily lasts two days, best phone I've owned.",
+            "The battery easily lasts two days, best phone I've owned!!",
+            "> The battery easily lasts two days\nNot for me, mine dies by dinner.",
+            "Camera is great in daylight but struggles at night.",
+            "Get free gift cards at example dot com",
+            "Get FREE gift cards at example dot com"
+        ],
+        'source': ['reddit', 'reddit', 'reddit', 'amazon', 'amazon', 'amazon']
+    })
+
+    deduplicator = MinHashDeduplicator()
+    kept = deduplicate_reviews(comments, 'body', source_column='source', deduplicator=deduplicator)
+
+    print("--- Kept comments ---")
+    for body in kept['body']:
+        print(f"- {body}")
+
+    print("\n--- Deduplication ratio by source ---")
+    for source, counts in deduplicator.stats().items():
+        print(f"{source}: {counts['duplicates']}/{counts['seen']} duplicates ({counts['dedup_ratio']:.0%})")
@@ -79,6 +79,26 @@ def get_sentences(text):
         return []
     return sent_tokenize(text)
 
+def get_sentence_spans(text):
+    """
+    Splits a block of text into sentences, returned as offsets into the text.
+    
+    Args:
+        text (str): The input text.
+        
+    Returns:
+        list of tuple: (start, end) offsets, one per sentence.
+    """
+    spans = []
+    cursor = 0
+    for sentence in get_sentences(text):
+        start = text.find(sentence, cursor)
+        if start == -1:
+            continue
+        cursor = start + len(sentence)
+        spans.append((start, cursor))
+    return spans
+
 if __name__ == '__main__':
     sample_review = """
     The battery life on this phone is amazing, it lasts for two days straight! 
@@ -0,0 +1,185 @@
+"""
+Compact, column-oriented storage for per-sentence analysis results.
+
+Instead of one dict per sentence, results are kept in flat typed arrays:
+aspect codes as int8, polarity as float32 and each sentence as a pair of
+offsets into the analyzed text. That is about 21 bytes per sentence, and the
+arrays can be handed to NumPy, pandas or Arrow without copying.
+"""
+
+import json
+from array import array
+
+import numpy as np
+import pandas as pd
+
+
+class AnalysisResults:
+    """
+    Column-oriented results of running the pipeline over one text.
+
+    Build it with `append`, then read it through the array properties or
+    convert it with `to_pandas`, `to_arrow` or `iter_json`. The array
+    properties are views on the underlying buffers, so drop them before
+    appending more rows.
+    """
+
+    __slots__ = ('text', 'aspects', '_aspect_codes', '_starts', '_ends', '_codes', '_polarity')
+
+    def __init__(self, text, aspects=()):
+        """
+        Args:
+            text (str): The analyzed text the sentence offsets point into.
+            aspects (iterable of str): Known aspect names, in display order.
+                                       Unknown aspects are added on append.
+        """
+        self.text = text
+        self.aspects = list(aspects)
+        self._aspect_codes = {aspect: code for code, aspect in enumerate(self.aspects)}
+        self._starts = array('q')
+        self._ends = array('q')
+        self._codes = array('b')
+        self._polarity = array('f')
+
+    def append(self, start, end, aspect, polarity):
+        """
+        Adds one analyzed sentence.
+
+        Args:
+            start (int): Offset of the sentence in `text`.
+            end (int): Offset just past the end of the sentence.
+            aspect (str): The sentence's aspect.
+            polarity (float): Polarity score between -1.0 and 1.0.
+
+        Raises:
+            ValueError: If this would be the 129th aspect.
+            BufferError: If a view returned by one of the array properties
+                         is still alive. Nothing is appended in that case.
+        """
+        code = self._aspect_codes.get(aspect)
+        new_aspect = code is None
+        if new_aspect:
+            code = len(self.aspects)
+            if code > 127:
+                raise ValueError("AnalysisResults supports at most 128 aspects")
+
+        columns = (self._starts, self._ends, self._codes, self._polarity)
+        for i, (column, value) in enumerate(zip(columns, (start, end, code, polarity))):
+            try:
+                column.append(value)
+            except BufferError:
+                # Keep the columns the same length
+                for appended in columns[:i]:
+                    appended.pop()
+                raise
+
+        if new_aspect:
+            self.aspects.append(aspect)
+            self._aspect_codes[aspect] = code
+
+    def __len__(self):
+        return len(self._codes)
+
+    # --- Zero-copy column views ---
+
+    @property
+    def starts(self):
+        return np.frombuffer(self._starts, dtype=np.int64)
+
+    @property
+    def ends(self):
+        return np.frombuffer(self._ends, dtype=np.int64)
+
+    @property
+    def aspect_codes(self):
+        return np.frombuffer(self._codes, dtype=np.int8)
+
+    @property
+    def polarity(self):
+        return np.frombuffer(self._polarity, dtype=np.float32)
+
+    # ------------------------------
+
+    def sentence(self, i):
+        """Returns the text of the i-th sentence."""
+        return self.text[self._starts[i]:self._ends[i]]
+
+    def sentences(self):
+        """Yields the sentence texts in order, slicing them on demand."""
+        text = self.text
+        for start, end in zip(self._starts, self._ends):
+            yield text[start:end]
+
+    def to_pandas(self, sentences=False):
+        """
+        Converts the results to a DataFrame.
+
+        The aspect column is a Categorical built on the int8 codes, and the
+        numeric columns wrap the existing buffers without copying them.
+
+        Args:
+            sentences (bool): Also add a 'sentence' column with the sentence
+                              text. This one has to materialize the strings.
+
+        Returns:
+            pd.DataFrame: Columns 'start', 'end', 'aspect', 'polarity' and
+                          optionally 'sentence'.
+        """
+        columns = {}
+        if sentences:
+            columns['sentence'] = list(self.sentences())
+        columns['start'] = self.starts
+        columns['end'] = self.ends
+        columns['aspect'] = pd.Categorical.from_codes(self.aspect_codes, categories=self.aspects)
+        columns['polarity'] = self.polarity
+        return pd.DataFrame(columns, copy=False)
+
+    def to_arrow(self):
+        """
+        Converts the results to a pyarrow Table without copying the columns.
+
+        Returns:
+            pyarrow.Table: Columns 'start', 'end', 'aspect' (dictionary
+                           encoded) and 'polarity'.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required for AnalysisResults.to_arrow()")
+
+        return pa.table({
+            'start': pa.array(self.starts),
+            'end': pa.array(self.ends),
+            'aspect': pa.DictionaryArray.from_arrays(pa.array(self.aspect_codes), pa.array(self.aspects)),
+            'polarity': pa.array(self.polarity)
+        })
+
+    def iter_json(self, chunk_size=1000):
+        """
+        Serializes the results as a JSON array, a chunk of rows at a time.
+
+        Each row has the shape the web front end expects:
+        {"sentence", "aspect", "polarity": {"label", "score"}, "score"}.
+
+        Args:
+            chunk_size (int): Number of rows per yielded string.
+
+        Yields:
+            str: Consecutive pieces of the JSON array.
+        """
+        aspect_names = [json.dumps(aspect) for aspect in self.aspects]
+        yield '['
+        rows = []
+        for i, (sentence, code, polarity) in enumerate(zip(self.sentences(), self._codes, self._polarity)):
+            label = 'NEGATIVE' if polarity < 0 else 'POSITIVE'
+            score = round(abs(polarity), 4)
+            rows.append(
+                f'{{"sentence": {json.dumps(sentence)}, "aspect": {aspect_names[code]}, '
+                f'"polarity": {{"label": "{label}", "score": {score}}}, "score": {score}}}'
+            )
+            if len(rows) == chunk_size:
+                yield (', ' if i >= chunk_size else '') + ', '.join(rows)
+                rows = []
+        if rows:
+            yield (', ' if len(self) > len(rows) else '') + ', '.join(rows)
+        yield ']'
@@ -0,0 +1,295 @@
+"""
+Aspect taxonomies loaded from config files, one per product category.
+
+Each file in the taxonomy directory (YAML or JSON) describes one product
+category and maps its aspects to keywords. Files are compiled once into a
+keyword matcher and a lemma lookup table, and the whole set is swapped in a
+single assignment, so a running server can pick up edits without a restart.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import yaml
+except ImportError:  # YAML support is optional, JSON always works
+    yaml = None
+
+# --- Configuration ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TAXONOMY_DIR = os.environ.get(
+    'ASPECT_PULSE_TAXONOMY_DIR', os.path.join(project_root, 'config', 'taxonomies')
+)
+DEFAULT_CATEGORY = os.environ.get('ASPECT_PULSE_DEFAULT_CATEGORY', 'smartphones')
+# Minimum number of seconds between two checks of the taxonomy directory.
+TAXONOMY_POLL_SECONDS = float(os.environ.get('ASPECT_PULSE_TAXONOMY_POLL_SECONDS', 5))
+
+# Built-in taxonomy, used when no config file exists for the default category.
+DEFAULT_ASPECT_KEYWORDS = {
+    'Battery': ['battery', 'charging', 'power', 'mah', 'charger', 'lasts', 'charge'],
+    'Camera': ['camera', 'photo', 'picture', 'video', 'lens', 'zoom', 'selfie', 'portraits'],
+    'Display': ['display', 'screen', 'oled', 'amoled', 'refresh rate', 'brightness', 'pixels'],
+    'Performance': ['performance', 'speed', 'fast', 'slow', 'lag', 'smooth', 'processor', 'ram', 'gaming'],
+    'Value': ['price', 'value', 'cheap', 'expensive', 'cost', 'worth', 'budget']
+}
+# ---------------------
+
+
+class Taxonomy:
+    """
+    A compiled aspect taxonomy for one product category.
+
+    Attributes:
+        name (str): The product category, e.g. 'smartphones'.
+        aspects (tuple of str): Aspect names in the order they were declared.
+        keywords (dict): Maps each aspect to a tuple of lowercase keywords.
+        version (str): Short content hash; changes whenever the keywords do.
+        lemma_table (dict): Maps a keyword to the first aspect declaring it.
+        source (str): The file the taxonomy was loaded from, if any.
+    """
+
+    def __init__(self, name, aspect_keywords, source=None):
+        self.name = name
+        self.source = source
+        self.aspects = tuple(aspect_keywords)
+        self.keywords = {
+            aspect: tuple(str(keyword).lower() for keyword in keywords)
+            for aspect, keywords in aspect_keywords.items()
+        }
+
+        canonical = json.dumps([name, [[a, list(k)] for a, k in self.keywords.items()]])
+        self.version = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:12]
+
+        # Earlier aspects win when the same keyword is listed twice, matching
+        # the declaration-order lookup the extractor has always used.
+        self.lemma_table = {}
+        for aspect in self.aspects:
+            for keyword in self.keywords[aspect]:
+                self.lemma_table.setdefault(keyword, aspect)
+
+        # One regex per aspect, so an aspect matches exactly when one of its
+        # keywords occurs in the sentence, even if a longer keyword of another
+        # aspect overlaps it ('screen' vs 'screen protector').
+        self._patterns = [
+            (aspect, re.compile('|'.join(map(re.escape, self.keywords[aspect]))))
+            for aspect in self.aspects if self.keywords[aspect]
+        ]
+
+    def match(self, sentence_lower):
+        """
+        Finds every aspect whose keywords occur in a lowercased sentence.
+
+        Args:
+            sentence_lower (str): The sentence, already lowercased.
+
+        Returns:
+            list of str: Matching aspects, in declaration order.
+        """
+        return [aspect for aspect, pattern in self._patterns if pattern.search(sentence_lower)]
+
+    def __repr__(self):
+        return f"Taxonomy(name={self.name!r}, version={self.version!r}, aspects={list(self.aspects)!r})"
+
+
+def load_taxonomy_file(path):
+    """
+    Loads and compiles a single taxonomy file.
+
+    The file must contain an 'aspects' mapping of aspect name to keyword list.
+    An optional 'name' overrides the category name taken from the file name.
+
+    Args:
+        path (str): Path to a .yaml, .yml or .json file.
+
+    Returns:
+        Taxonomy: The compiled taxonomy.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+        else:
+            if yaml is None:
+                raise ImportError(f"PyYAML is required to load '{path}'")
+            data = yaml.safe_load(f)
+
+    if not isinstance(data, dict) or not isinstance(data.get('aspects'), dict) or not data['aspects']:
+        raise ValueError(f"Taxonomy file '{path}' must define a non-empty 'aspects' mapping")
+
+    name = data.get('name', os.path.splitext(os.path.basename(path))[0])
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Taxonomy file '{path}': 'name' must be a string")
+    for aspect, keywords in data['aspects'].items():
+        # YAML turns unquoted keys like Yes or 1 into booleans and numbers
+        if not isinstance(aspect, str) or not aspect:
+            raise ValueError(f"Taxonomy file '{path}': aspect name {aspect!r} must be a string (quote it)")
+        if (not isinstance(keywords, list) or not keywords
+                or not all(isinstance(keyword, str) and keyword.strip() for keyword in keywords)):
+            raise ValueError(f"Taxonomy file '{path}': aspect '{aspect}' needs a non-empty list of keyword strings")
+
+    return Taxonomy(name, data['aspects'], source=path)
+
+
+def _taxonomy_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, filename)
+        for filename in os.listdir(directory)
+        if filename.endswith(('.yaml', '.yml', '.json'))
+    )
+
+
+def _directory_signature(directory):
+    signature = []
+    for path in _taxonomy_files(directory):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_taxonomies(directory=None, previous=None):
+    """
+    Loads every taxonomy file in a directory.
+
+    A file that fails to load is reported and skipped; the other files still
+    load. If `previous` holds a taxonomy loaded earlier from that file, it is
+    kept instead.
+
+    Args:
+        directory (str): The directory to scan. Defaults to TAXONOMY_DIR.
+        previous (dict): The currently active {category: Taxonomy} mapping.
+
+    Returns:
+        dict: Maps category name to its compiled Taxonomy. Always contains
+              DEFAULT_CATEGORY, falling back to the built-in keywords.
+    """
+    directory = directory or TAXONOMY_DIR
+    previous_by_source = {t.source: t for t in (previous or {}).values() if t.source}
+    taxonomies = {}
+    for path in _taxonomy_files(directory):
+        try:
+            taxonomy = load_taxonomy_file(path)
+        except Exception as e:
+            print(f"Error loading taxonomy file {path}: {e}")
+            taxonomy = previous_by_source.get(path)
+            if taxonomy is None:
+                continue
+        taxonomies[taxonomy.name] = taxonomy
+
+    if DEFAULT_CATEGORY not in taxonomies:
+        taxonomies[DEFAULT_CATEGORY] = Taxonomy(DEFAULT_CATEGORY, DEFAULT_ASPECT_KEYWORDS)
+    return taxonomies
+
+
+# --- Active taxonomy registry ---
+# `_taxonomies` is only ever replaced, never mutated, so readers always see
+# either the old set or the new one and never a half-loaded mix.
+_taxonomies = None
+_signature = None
+_last_check = 0.0
+_lock = threading.Lock()
+_reload_callbacks = []
+
+
+def register_reload_callback(callback):
+    """
+    Registers a function to call after the active taxonomies are swapped.
+
+    Args:
+        callback (callable): Called with the new {category: Taxonomy} dict.
+    """
+    _reload_callbacks.append(callback)
+
+
+def reload_taxonomies(directory=None):
+    """
+    Reloads all taxonomies from disk and swaps them in atomically.
+
+    A file that fails to load keeps its previously loaded version, if any.
+
+    Args:
+        directory (str): The directory to scan. Defaults to TAXONOMY_DIR.
+
+    Returns:
+        dict: The active {category: Taxonomy} mapping after the reload.
+    """
+    global _taxonomies, _signature, _last_check
+    directory = directory or TAXONOMY_DIR
+
+    with _lock:
+        # Recorded even if a file is broken, so it is not re-parsed on every poll
+        _signature = _directory_signature(directory)
+        _last_check = time.monotonic()
+        taxonomies = load_taxonomies(directory, previous=_taxonomies)
+        _taxonomies = taxonomies
+
+    print(f"Loaded taxonomies: {', '.join(f'{t.name}@{t.version}' for t in taxonomies.values())}")
+    for callback in _reload_callbacks:
+        callback(taxonomies)
+    return taxonomies
+
+
+def refresh_if_changed(directory=None):
+    """
+    Reloads the taxonomies if any file in the directory changed on disk.
+
+    Cheap enough to call on every request: the directory is checked at most
+    once every TAXONOMY_POLL_SECONDS.
+
+    Args:
+        directory (str): The directory to scan. Defaults to TAXONOMY_DIR.
+
+    Returns:
+        bool: True if the reload changed any active taxonomy.
+    """
+    global _last_check
+    now = time.monotonic()
+    if _taxonomies is not None and now - _last_check < TAXONOMY_POLL_SECONDS:
+        return False
+    _last_check = now
+
+    if _taxonomies is not None and _directory_signature(directory or TAXONOMY_DIR) == _signature:
+        return False
+    before = {name: t.version for name, t in (_taxonomies or {}).items()}
+    after = {name: t.version for name, t in reload_taxonomies(directory).items()}
+    return before != after
+
+
+def get_taxonomies():
+    """
+    Returns the active taxonomies, loading them on first use.
+
+    Returns:
+        dict: Maps category name to its compiled Taxonomy.
+    """
+    taxonomies = _taxonomies
+    if taxonomies is None:
+        taxonomies = reload_taxonomies()
+    return taxonomies
+
+
+def get_taxonomy(category=None):
+    """
+    Returns the active taxonomy for a product category.
+
+    Args:
+        category (str): The product category. Defaults to DEFAULT_CATEGORY.
+
+    Returns:
+        Taxonomy: The compiled taxonomy.
+
+    Raises:
+        KeyError: If no taxonomy exists for the category.
+    """
+    taxonomies = get_taxonomies()
+    category = category or DEFAULT_CATEGORY
+    if category not in taxonomies:
+        raise KeyError(f"Unknown product category '{category}'")
+    return taxonomies[category]
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from nlp.preprocessing import get_sentences
+from nlp.aspect_extractor import extract_aspect
+from nlp.deduplication import MinHashDeduplicator, deduplicate_reviews
+from nlp.taxonomy import get_taxonomy
+from sentiment.sentiment_model import get_sentiment
+
+def analyze_comments(df, text_column, sentiment_pipeline, source=None, source_column=None,
+                     category=None, deduplicator=None):
+    """
+    Deduplicates scraped comments and runs the aspect and sentiment pipeline
+    over every sentence that is left.
+
+    Args:
+        df (pd.DataFrame): Scraped data, e.g. from get_subreddit_comments
+                           or extract_reviews.
+        text_column (str): Column holding the text ('body', 'review_text').
+        sentiment_pipeline (transformers.Pipeline): The sentiment analysis pipeline.
+        source (str): Source name for the deduplication statistics.
+        source_column (str): Column holding the source name per row instead.
+        category (str): The product category whose taxonomy to use.
+        deduplicator (MinHashDeduplicator): Reuse one across calls to dedupe
+                                            across batches.
+
+    Returns:
+        pd.DataFrame: One row per classified sentence, with the index label of
+                      the comment it came from ('comment'), 'aspect' and 'polarity'.
+    """
+    if deduplicator is None:
+        deduplicator = MinHashDeduplicator()
+    comments = deduplicate_reviews(df, text_column, source=source, source_column=source_column,
+                                   deduplicator=deduplicator)
+
+    rows, aspects, polarities = [], [], []
+    if not comments.empty:
+        for index, text in comments[text_column].items():
+            for sentence in get_sentences(text):
+                if len(sentence.strip()) < 3:
+                    continue
+                aspect = extract_aspect(sentence, category)
+                if aspect != 'Unclassified':
+                    rows.append(index)
+                    aspects.append(aspect)
+                    polarities.append(get_sentiment(sentence, sentiment_pipeline))
+
+    return pd.DataFrame({
+        'comment': rows,
+        'aspect': pd.Categorical(aspects, categories=get_taxonomy(category).aspects),
+        'polarity': np.array(polarities, dtype=np.float32)
+    })
+
+def ingest_comments(df, product, trend_engine, sentiment_pipeline, text_column='body',
+                    source=None, category=None, deduplicator=None):
+    """
+    Analyzes scraped comments and adds the results to a trend engine, dated
+    with each comment's own 'created_utc'.
+
+    Args:
+        df (pd.DataFrame): Scraped comments with a 'created_utc' column, e.g.
+                           from get_subreddit_comments.
+        product (str): The product the comments are about.
+        trend_engine (TrendEngine): The engine to feed.
+        sentiment_pipeline (transformers.Pipeline): The sentiment analysis pipeline.
+        text_column (str): Column holding the text.
+        source (str): Source name for the deduplication statistics.
+        category (str): The product category whose taxonomy to use.
+        deduplicator (MinHashDeduplicator): Reuse one across calls.
+
+    Returns:
+        pd.DataFrame: The records added to the engine.
+    """
+    sentences = analyze_comments(df, text_column, sentiment_pipeline, source=source or product,
+                                 category=category, deduplicator=deduplicator)
+    records = pd.DataFrame({
+        'created_utc': df.loc[sentences['comment'], 'created_utc'].to_numpy(),
+        'product': product,
+        'aspect': sentences['aspect'],
+        'polarity': sentences['polarity']
+    })
+    trend_engine.add(records)
+    return records
+
+if __name__ == '__main__':
+    from scrapers.reddit_scraper import initialize_reddit_client, get_subreddit_comments
+    from sentiment.sentiment_model import get_sentiment_pipeline
+    from sentiment.trends import TrendEngine, get_trend_store
+
+    # --- Replace with your credentials ---
+    CLIENT_ID = "YOUR_CLIENT_ID"
+    CLIENT_SECRET = "YOUR_CLIENT_SECRET"
+    USER_AGENT = "Aspect-Pulse v1.0 by u/your_username"
+    # ------------------------------------
+
+    reddit_client = initialize_reddit_client(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
+    sentiment_analyzer = get_sentiment_pipeline()
+
+    if reddit_client and sentiment_analyzer:
+        # Set ASPECT_PULSE_DB_HOST etc. to share the trends with the web app
+        trend_engine = TrendEngine(store=get_trend_store())
+        deduplicator = MinHashDeduplicator()
+        for subreddit in ['apple', 'samsung']:
+            comments_df = get_subreddit_comments(reddit_client, subreddit, limit=200)
+            if comments_df.empty:
+                continue
+            ingest_comments(comments_df, subreddit, trend_engine, sentiment_analyzer,
+                            deduplicator=deduplicator)
+
+        print("\n--- Daily change points ---")
+        for point in trend_engine.get_change_points('day'):
+            print(f"{point['time'][:10]} {point['product']} / {point['aspect']}: "
+                  f"{point['baseline']:+.2f} -> {point['polarity']:+.2f}")
+
+        print("\n--- Deduplication ratio by source ---")
+        for source, counts in deduplicator.stats().items():
+            print(f"{source}: {counts['duplicates']}/{counts['seen']} duplicates ({counts['dedup_ratio']:.0%})")
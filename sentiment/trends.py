@@ -0,0 +1,512 @@
+"""
+Time-windowed aspect sentiment trends.
+
+Analyzed sentences are bucketed by their timestamp (e.g. a Reddit comment's
+`created_utc`) into hourly, daily and weekly windows per product and aspect.
+Each new batch only adds to the per-bucket sums and counts held in a trend
+store, and the rolling polarity series and change points of the (product,
+aspect) pairs it touched are recomputed with vectorized pandas operations
+on the next read.
+
+The default store lives in process memory. Use MySQLTrendStore when several
+processes (e.g. gunicorn workers, or a scraper job and the web app) need to
+see the same trends.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Trend Settings ---
+# Window name -> pandas period alias
+WINDOWS = {'hour': 'h', 'day': 'D', 'week': 'W'}
+# Number of buckets averaged into each rolling polarity value
+ROLLING_BUCKETS = {'hour': 6, 'day': 7, 'week': 4}
+# Number of buckets kept per window; older buckets are discarded
+RETENTION_BUCKETS = {'hour': 24 * 14, 'day': 365, 'week': 260}
+# How often an engine on a shared store reloads what other processes added
+REFRESH_SECONDS = float(os.environ.get('ASPECT_PULSE_TREND_REFRESH_SECONDS', 30))
+
+# A bucket is a change point when its mean polarity falls this many standard
+# deviations below the mean of the previous BASELINE_BUCKETS buckets...
+BASELINE_BUCKETS = 7
+CHANGE_Z_THRESHOLD = 2.5
+# ...by at least this much, backed by at least this many sentences.
+MIN_POLARITY_DROP = 0.3
+MIN_BUCKET_COUNT = 5
+MIN_BASELINE_STD = 0.1
+
+# Sentences dated further than this into the future are dropped
+MAX_CLOCK_SKEW_SECONDS = 300
+# Product names come from clients, so bound their length and number
+MAX_PRODUCT_LENGTH = 100
+MAX_PRODUCTS = 1000
+# ----------------------
+
+_TOTAL_COLUMNS = ['bucket', 'product', 'aspect', 'polarity_sum', 'count']
+
+
+class MemoryTrendStore:
+    """
+    Keeps bucket totals in process memory. Only shared by engines in the
+    same process.
+    """
+
+    shared = False
+
+    def __init__(self):
+        # window -> {(bucket, product, aspect): (polarity_sum, count)}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def add(self, window, totals):
+        """
+        Adds bucket totals.
+
+        Args:
+            window (str): 'hour', 'day' or 'week'.
+            totals (pd.DataFrame): Columns 'bucket' (UTC timestamp), 'product',
+                'aspect', 'polarity_sum' and 'count'.
+        """
+        with self._lock:
+            buckets = self._totals.setdefault(window, {})
+            for bucket, product, aspect, polarity_sum, count in totals[_TOTAL_COLUMNS].itertuples(index=False):
+                key = (bucket, product, aspect)
+                old_sum, old_count = buckets.get(key, (0.0, 0))
+                buckets[key] = (old_sum + polarity_sum, old_count + count)
+
+    def load(self, window):
+        """Returns all bucket totals of a window, in the format `add` takes."""
+        with self._lock:
+            items = list(self._totals.get(window, {}).items())
+        if not items:
+            return pd.DataFrame(columns=_TOTAL_COLUMNS)
+        keys, values = zip(*items)
+        totals = pd.DataFrame(list(keys), columns=_TOTAL_COLUMNS[:3])
+        totals['polarity_sum'], totals['count'] = zip(*values)
+        return totals
+
+    def prune(self, window, before):
+        """Deletes the buckets of a window that start before a timestamp."""
+        with self._lock:
+            buckets = self._totals.get(window)
+            if buckets is not None:
+                self._totals[window] = {key: value for key, value in buckets.items() if key[0] >= before}
+
+
+class MySQLTrendStore:
+    """
+    Keeps bucket totals in a MySQL table, so every process sees the same trends.
+    """
+
+    shared = True
+
+    def __init__(self, connect, table='trend_buckets'):
+        """
+        Args:
+            connect (callable): Returns a new DB-API connection, e.g.
+                                a `mysql.connector.connect` partial.
+            table (str): The table to keep the totals in.
+        """
+        self._connect = connect
+        self.table = table
+        self._execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                window_name VARCHAR(8) NOT NULL,
+                bucket DATETIME NOT NULL,
+                product VARCHAR(255) NOT NULL,
+                aspect VARCHAR(64) NOT NULL,
+                polarity_sum DOUBLE NOT NULL,
+                sentence_count BIGINT NOT NULL,
+                PRIMARY KEY (window_name, bucket, product, aspect)
+            )
+        """)
+
+    def _execute(self, query, params=None, many=False, fetch=False):
+        connection = self._connect()
+        try:
+            cursor = connection.cursor()
+            if many:
+                cursor.executemany(query, params)
+            else:
+                cursor.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+            connection.commit()
+            return rows
+        finally:
+            connection.close()
+
+    def add(self, window, totals):
+        """Adds bucket totals, see MemoryTrendStore.add."""
+        rows = [
+            (window, bucket.tz_convert('UTC').tz_localize(None).to_pydatetime(),
+             str(product), str(aspect), float(polarity_sum), int(count))
+            for bucket, product, aspect, polarity_sum, count
+            in totals[_TOTAL_COLUMNS].itertuples(index=False)
+        ]
+        self._execute(f"""
+            INSERT INTO {self.table}
+                (window_name, bucket, product, aspect, polarity_sum, sentence_count)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                polarity_sum = polarity_sum + VALUES(polarity_sum),
+                sentence_count = sentence_count + VALUES(sentence_count)
+        """, rows, many=True)
+
+    def load(self, window):
+        """Returns all bucket totals of a window, see MemoryTrendStore.load."""
+        rows = self._execute(f"""
+            SELECT bucket, product, aspect, polarity_sum, sentence_count
+            FROM {self.table} WHERE window_name = %s
+        """, (window,), fetch=True)
+        totals = pd.DataFrame(rows, columns=_TOTAL_COLUMNS)
+        totals['bucket'] = pd.to_datetime(totals['bucket']).dt.tz_localize('UTC')
+        return totals
+
+    def prune(self, window, before):
+        """Deletes the buckets of a window that start before a timestamp."""
+        self._execute(f"DELETE FROM {self.table} WHERE window_name = %s AND bucket < %s",
+                      (window, before.tz_convert('UTC').tz_localize(None).to_pydatetime()))
+
+
+def get_trend_store():
+    """
+    Returns the trend store configured through the environment.
+
+    Returns:
+        MySQLTrendStore if ASPECT_PULSE_DB_HOST is set, else MemoryTrendStore.
+    """
+    if not os.environ.get('ASPECT_PULSE_DB_HOST'):
+        return MemoryTrendStore()
+
+    import mysql.connector
+
+    return MySQLTrendStore(lambda: mysql.connector.connect(
+        host=os.environ['ASPECT_PULSE_DB_HOST'],
+        user=os.environ.get('ASPECT_PULSE_DB_USER', 'root'),
+        password=os.environ.get('ASPECT_PULSE_DB_PASSWORD', ''),
+        database=os.environ.get('ASPECT_PULSE_DB_NAME', 'aspect_pulse')
+    ))
+
+
+class TrendEngine:
+    """
+    Incrementally maintained per-aspect polarity trends.
+
+    Feed it analyzed sentences with `add`; read the results with
+    `get_series` and `get_change_points`. Each batch only updates the bucket
+    totals it touches, and the rolling series and change points of the
+    affected (product, aspect) columns are recomputed on the next read.
+    """
+
+    def __init__(self, windows=None, store=None, clock=time.time):
+        """
+        Args:
+            windows (list of str): Windows to maintain. Defaults to all of WINDOWS.
+            store (MemoryTrendStore or MySQLTrendStore): Where the bucket
+                totals are kept. Defaults to a new MemoryTrendStore.
+            clock (callable): Returns the current epoch time; retention is
+                measured back from it.
+        """
+        self.windows = list(windows or WINDOWS)
+        self.store = store if store is not None else MemoryTrendStore()
+        self.clock = clock
+        # window -> DataFrame indexed by bucket start, with one column per
+        # (product, aspect) pair, holding polarity sums and sentence counts.
+        # Replaced, never modified in place, so readers can keep using them.
+        self._sums = {}
+        self._counts = {}
+        # Results computed from them, and the columns whose results are stale.
+        # A window missing from _series is recomputed in full on the next read.
+        self._series = {}
+        self._change_points = {}
+        self._stale = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def add(self, records):
+        """
+        Adds analyzed sentences to the trends.
+
+        Sentences dated more than MAX_CLOCK_SKEW_SECONDS into the future are
+        dropped, and ones older than the retention of a window are ignored
+        by that window.
+
+        Args:
+            records (pd.DataFrame): One row per sentence with columns
+                'created_utc' (epoch seconds or datetime), 'product',
+                'aspect' and 'polarity' (-1.0 to 1.0).
+
+        Raises:
+            ValueError: If a product name is not a non-empty string of at most
+                MAX_PRODUCT_LENGTH characters, or the batch would bring the
+                number of tracked products above MAX_PRODUCTS.
+        """
+        if records is None or len(records) == 0:
+            return
+        records = records[records['aspect'] != 'Unclassified']
+        if len(records) == 0:
+            return
+
+        timestamps = records['created_utc']
+        if not pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = pd.to_datetime(timestamps, unit='s', utc=True)
+        elif timestamps.dt.tz is None:
+            timestamps = timestamps.dt.tz_localize('UTC')
+        # Periods carry no timezone, bucket on naive UTC and restore it after
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+
+        latest = pd.Timestamp(self.clock() + MAX_CLOCK_SKEW_SECONDS, unit='s')
+        in_range = (timestamps <= latest).to_numpy()
+        if not in_range.all():
+            records, timestamps = records[in_range], timestamps[in_range]
+            if len(records) == 0:
+                return
+        polarity = records['polarity'].astype('float64')
+
+        # Make sure this engine knows every product already in the store
+        self.refresh()
+        with self._lock:
+            self._check_products(records['product'].unique())
+            for window in self.windows:
+                buckets = timestamps.dt.to_period(WINDOWS[window]).dt.start_time.dt.tz_localize('UTC')
+                grouped = polarity.groupby([buckets.rename('bucket'), records['product'].rename('product'),
+                                            records['aspect'].rename('aspect')], observed=True)
+                totals = pd.DataFrame({'polarity_sum': grouped.sum(), 'count': grouped.count()})
+                self.store.add(window, totals.reset_index())
+                self._merge(window, totals)
+
+    def _check_products(self, products):
+        for product in products:
+            if not isinstance(product, str) or not product.strip() or len(product) > MAX_PRODUCT_LENGTH:
+                raise ValueError(f"Product names must be non-empty strings of at most "
+                                 f"{MAX_PRODUCT_LENGTH} characters, got {product!r}")
+        known = set()
+        for sums in self._sums.values():
+            known.update(sums.columns.get_level_values('product'))
+        if len(known.union(products)) > MAX_PRODUCTS:
+            raise ValueError(f"At most {MAX_PRODUCTS} products can be tracked")
+
+    def refresh(self, force=False):
+        """
+        Reloads the totals from the store if other processes may have added
+        to it since the last load.
+
+        Args:
+            force (bool): Reload even if the last load is recent.
+        """
+        if not force and self._loaded_at is not None:
+            if not self.store.shared or time.monotonic() - self._loaded_at < REFRESH_SECONDS:
+                return
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        for window in self.windows:
+            totals = self.store.load(window)
+            if not totals.empty:
+                self._merge(window, totals.set_index(['bucket', 'product', 'aspect']), replace=True)
+        self._loaded_at = time.monotonic()
+
+    def _retention_start(self, window):
+        freq = WINDOWS[window]
+        now = pd.Timestamp(self.clock(), unit='s').to_period(freq)
+        return (now - (RETENTION_BUCKETS[window] - 1)).start_time.tz_localize('UTC')
+
+    def _merge(self, window, totals, replace=False):
+        # Folds bucket totals, indexed by (bucket, product, aspect), into the
+        # wide frames of a window, or replaces the frames with them.
+        sums = totals['polarity_sum'].astype('float64').unstack(['product', 'aspect'])
+        counts = totals['count'].astype('float64').unstack(['product', 'aspect'])
+        previous = None if replace else self._sums.get(window)
+        if previous is not None:
+            rows = previous.index.get_indexer(sums.index)
+            columns = previous.columns.get_indexer(sums.columns)
+            if (rows >= 0).all() and (columns >= 0).all():
+                # The common case, a batch within the known buckets and
+                # columns: add it positionally instead of aligning frames
+                cells = np.ix_(rows, columns)
+                new_sums = previous.to_numpy(copy=True)
+                new_sums[cells] += sums.fillna(0).to_numpy()
+                new_counts = self._counts[window].to_numpy(copy=True)
+                new_counts[cells] += counts.fillna(0).to_numpy()
+                self._sums[window] = pd.DataFrame(new_sums, previous.index, previous.columns)
+                self._counts[window] = pd.DataFrame(new_counts, previous.index, previous.columns)
+                self._stale[window] = self._stale.get(window, set()).union(sums.columns)
+                return
+            sums = previous.add(sums, fill_value=0)
+            counts = self._counts[window].add(counts, fill_value=0)
+
+        # Fill in empty buckets so rolling windows count time, not rows. The
+        # retention is measured from now, so no timestamp can push it forward.
+        start = self._retention_start(window)
+        if sums.index.min() < start:
+            self.store.prune(window, start)
+        first, last = max(sums.index.min(), start), sums.index.max()
+        if first <= last:
+            periods = pd.period_range(first.tz_localize(None), last.tz_localize(None), freq=WINDOWS[window])
+            full_range = periods.start_time.tz_localize('UTC')
+        else:
+            full_range = pd.DatetimeIndex([], tz='UTC')
+        sums = sums.reindex(full_range).fillna(0)
+        counts = counts.reindex(full_range).fillna(0)
+        # Drop the (product, aspect) pairs that only had expired buckets
+        active = counts.to_numpy().any(axis=0)
+        if not active.all():
+            sums, counts = sums.loc[:, active], counts.loc[:, active]
+
+        # The buckets or columns changed, so all results are recomputed
+        self._sums[window], self._counts[window] = sums, counts
+        self._series.pop(window, None)
+        self._stale.pop(window, None)
+
+    def _results(self, window):
+        # Recomputes the results of the stale columns of a window, if any
+        self.refresh()
+        with self._lock:
+            stale = self._stale.pop(window, None)
+            if window not in self._sums:
+                return None, []
+
+            sums, counts = self._sums[window], self._counts[window]
+            if window not in self._series:
+                self._series[window] = self._compute_series(window, sums, counts)
+                self._change_points[window] = self._detect_change_points(sums, counts)
+            elif stale:
+                columns = [column for column in sums.columns if column in stale]
+                series = self._compute_series(window, sums[columns], counts[columns])
+                polarity = self._series[window]['polarity'].copy()
+                polarity[columns] = series['polarity']
+                self._series[window] = {'polarity': polarity, 'count': counts}
+
+                change_points = [point for point in self._change_points[window]
+                                 if (point['product'], point['aspect']) not in stale]
+                change_points += self._detect_change_points(sums[columns], counts[columns])
+                change_points.sort(key=lambda point: point['time'], reverse=True)
+                self._change_points[window] = change_points
+            return self._series[window], self._change_points[window]
+
+    def _compute_series(self, window, sums, counts):
+        rolling = ROLLING_BUCKETS[window]
+        rolling_sums = sums.rolling(rolling, min_periods=1).sum()
+        rolling_counts = counts.rolling(rolling, min_periods=1).sum()
+        return {
+            'polarity': rolling_sums / rolling_counts.replace(0, np.nan),
+            'count': counts
+        }
+
+    def _detect_change_points(self, sums, counts):
+        if sums.empty:
+            return []
+        means = sums / counts.replace(0, np.nan)
+
+        previous = means.shift(1).rolling(BASELINE_BUCKETS, min_periods=2)
+        baseline = previous.mean()
+        spread = previous.std().clip(lower=MIN_BASELINE_STD)
+        drop = baseline - means
+        flagged = ((drop / spread >= CHANGE_Z_THRESHOLD)
+                   & (drop >= MIN_POLARITY_DROP)
+                   & (counts >= MIN_BUCKET_COUNT))
+
+        flagged = flagged.stack(['product', 'aspect'])
+        change_points = []
+        for bucket, product, aspect in flagged[flagged].index:
+            change_points.append({
+                'time': bucket.isoformat(),
+                'product': product,
+                'aspect': aspect,
+                'polarity': float(means.at[bucket, (product, aspect)]),
+                'baseline': float(baseline.at[bucket, (product, aspect)]),
+                'count': int(counts.at[bucket, (product, aspect)])
+            })
+        change_points.sort(key=lambda point: point['time'], reverse=True)
+        return change_points
+
+    def get_series(self, window='day', product=None, aspect=None):
+        """
+        Returns the precomputed rolling polarity series.
+
+        Args:
+            window (str): 'hour', 'day' or 'week'.
+            product (str): Only return series for this product.
+            aspect (str): Only return series for this aspect.
+
+        Returns:
+            list of dict: One entry per (product, aspect) with a list of
+                          points {'time', 'polarity', 'count'}.
+        """
+        if window not in self.windows:
+            raise ValueError(f"Unknown window '{window}', expected one of {self.windows}")
+        series, _ = self._results(window)
+        if series is None:
+            return []
+
+        polarity, counts = series['polarity'], series['count']
+        times = [bucket.isoformat() for bucket in polarity.index]
+        result = []
+        for column in polarity.columns:
+            if (product and column[0] != product) or (aspect and column[1] != aspect):
+                continue
+            values = polarity[column].to_numpy()
+            result.append({
+                'product': column[0],
+                'aspect': column[1],
+                'points': [
+                    {'time': t, 'polarity': None if np.isnan(v) else round(float(v), 4), 'count': int(c)}
+                    for t, v, c in zip(times, values, counts[column].to_numpy())
+                ]
+            })
+        return result
+
+    def get_change_points(self, window='day', product=None, aspect=None):
+        """
+        Returns detected sudden polarity drops, newest first.
+
+        Args:
+            window (str): 'hour', 'day' or 'week'.
+            product (str): Only return change points for this product.
+            aspect (str): Only return change points for this aspect.
+
+        Returns:
+            list of dict: {'time', 'product', 'aspect', 'polarity', 'baseline', 'count'}.
+        """
+        if window not in self.windows:
+            raise ValueError(f"Unknown window '{window}', expected one of {self.windows}")
+        _, change_points = self._results(window)
+        return [
+            point for point in change_points
+            if (not product or point['product'] == product) and (not aspect or point['aspect'] == aspect)
+        ]
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    start = time.time() - 30 * 24 * 3600
+    n = 3000
+    created_utc = start + rng.uniform(0, 30 * 24 * 3600, n)
+    aspects = rng.choice(['Battery', 'Camera'], n)
+    polarity = rng.normal(0.4, 0.3, n)
+    # Simulate an OS update on day 20 that wrecks battery life
+    after_update = (created_utc > start + 20 * 24 * 3600) & (aspects == 'Battery')
+    polarity[after_update] -= 1.0
+
+    engine = TrendEngine()
+    # Feed the data in three batches, as if it arrived over time
+    records = pd.DataFrame({
+        'created_utc': created_utc, 'product': 'Galaxy S23',
+        'aspect': aspects, 'polarity': polarity.clip(-1, 1)
+    }).sort_values('created_utc')
+    for i in range(0, n, n // 3):
+        engine.add(records.iloc[i:i + n // 3])
+
+    print("--- Daily Battery polarity (rolling) ---")
+    for point in engine.get_series('day', aspect='Battery')[0]['points'][-14:]:
+        print(f"{point['time'][:10]}  {point['polarity']:+.2f}  ({point['count']} sentences)")
+
+    print("\n--- Change points ---")
+    for point in engine.get_change_points('day'):
+        print(f"{point['time'][:10]} {point['product']} / {point['aspect']}: "
+              f"{point['baseline']:+.2f} -> {point['polarity']:+.2f}")
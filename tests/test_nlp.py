@@ -0,0 +1,260 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nlp import taxonomy as taxonomy_module
+from nlp.deduplication import MinHashDeduplicator, deduplicate_reviews, strip_quotes
+from nlp.results import AnalysisResults
+from nlp.taxonomy import Taxonomy, load_taxonomy_file, refresh_if_changed, reload_taxonomies
+
+REVIEW = ("The battery life on this phone is amazing and it easily lasts two full days "
+          "with heavy use, and the camera is also very good in daylight.")
+
+
+def test_near_duplicate_is_detected():
+    deduplicator = MinHashDeduplicator()
+    assert not deduplicator.check(REVIEW)
+    assert deduplicator.check(REVIEW.upper() + "!!")
+    assert deduplicator.check(REVIEW.replace("two full days", "two full days straight"))
+
+
+def test_distinct_text_is_kept():
+    deduplicator = MinHashDeduplicator()
+    assert not deduplicator.check(REVIEW)
+    assert not deduplicator.check("The screen is far too dim outdoors and the speakers sound tinny.")
+
+
+def test_empty_texts_are_not_duplicates():
+    deduplicator = MinHashDeduplicator()
+    assert not deduplicator.check("")
+    assert not deduplicator.check(strip_quotes("> only a quote"))
+    assert not deduplicator.check("!!!")
+    assert deduplicator.stats() == {}
+
+
+def test_old_documents_are_forgotten():
+    deduplicator = MinHashDeduplicator(max_documents=2)
+    for i in range(5):
+        deduplicator.check(f"review number {i} about a completely different topic {i * 7}")
+    assert len(deduplicator._documents) == 2
+    assert len(deduplicator._buckets) <= 2 * deduplicator.num_bands
+
+
+def test_eviction_keeps_newer_documents_indexed():
+    # One row per band, so partially overlapping texts share some buckets
+    deduplicator = MinHashDeduplicator(num_perm=16, num_bands=16, max_documents=2)
+    words = [f"word{i}" for i in range(40)]
+    assert not deduplicator.check(' '.join(words[:30]))
+    assert not deduplicator.check(' '.join(words[15:]))
+    assert not deduplicator.check("something else entirely, nothing in common at all")
+
+    # The first text was evicted; the second must still be reachable from all its bands
+    doc_id, (signature, _) = next(iter(deduplicator._documents.items()))
+    keys = deduplicator._band_keys(np.frombuffer(signature, dtype=np.uint32))
+    assert all(deduplicator._buckets.get(key) == doc_id for key in keys)
+    assert deduplicator.check(' '.join(words[15:]).upper())
+
+
+def test_batched_signatures_match_single_ones():
+    deduplicator = MinHashDeduplicator()
+    texts = [REVIEW, "", "short", "Get free gift cards now"] * 100
+    batch = deduplicator.signatures(texts)
+    assert batch.shape == (len(texts), 128)
+    for text, signature in zip(texts[:4], batch):
+        assert (deduplicator.signature(text) == signature).all()
+
+
+def test_deduplicate_reviews_reports_ratio_per_source():
+    df = pd.DataFrame({
+        'body': [REVIEW, REVIEW + "!", "> " + REVIEW + "\nMine dies by dinner though.",
+                 "Get free gift cards now", "Get FREE gift cards now", None],
+        'source': ['reddit', 'reddit', 'reddit', 'amazon', 'amazon', 'amazon']
+    })
+    deduplicator = MinHashDeduplicator()
+    kept = deduplicate_reviews(df, 'body', source_column='source', deduplicator=deduplicator)
+
+    assert list(kept.index) == [0, 2, 3, 5]
+    assert kept.loc[2, 'body'] == "Mine dies by dinner though."
+    stats = deduplicator.stats()
+    assert stats['reddit'] == {'seen': 3, 'duplicates': 1, 'dedup_ratio': 1 / 3}
+    assert stats['amazon'] == {'seen': 2, 'duplicates': 1, 'dedup_ratio': 0.5}
+
+
+# --- Aspect taxonomies ---
+
+
+@pytest.fixture
+def taxonomy_dir(tmp_path, monkeypatch):
+    """An empty taxonomy directory, with the module registry reset around the test."""
+    monkeypatch.setattr(taxonomy_module, 'TAXONOMY_DIR', str(tmp_path))
+    monkeypatch.setattr(taxonomy_module, 'TAXONOMY_POLL_SECONDS', 0)
+    monkeypatch.setattr(taxonomy_module, '_taxonomies', None)
+    monkeypatch.setattr(taxonomy_module, '_signature', None)
+    monkeypatch.setattr(taxonomy_module, '_last_check', 0.0)
+    return tmp_path
+
+
+def write_taxonomy(directory, name, aspects, mtime=None):
+    path = directory / f'{name}.json'
+    path.write_text(json.dumps({'name': name, 'aspects': aspects}))
+    if mtime is not None:
+        # Make sure the change is visible even on coarse filesystem clocks
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_match_finds_overlapping_keywords_of_different_aspects():
+    taxonomy = Taxonomy('x', {'A': ['screen'], 'B': ['screen protector'], 'C': ['price']})
+    assert taxonomy.match('the screen protector') == ['A', 'B']
+    assert taxonomy.match('great price, nice screen') == ['A', 'C']
+    assert taxonomy.match('nothing here') == []
+
+
+def test_lemma_table_prefers_first_declared_aspect():
+    taxonomy = Taxonomy('x', {'A': ['Charge'], 'B': ['charge', 'fast']})
+    assert taxonomy.lemma_table == {'charge': 'A', 'fast': 'B'}
+
+
+def test_version_changes_with_keywords():
+    assert Taxonomy('x', {'A': ['a']}).version == Taxonomy('x', {'A': ['a']}).version
+    assert Taxonomy('x', {'A': ['a']}).version != Taxonomy('x', {'A': ['b']}).version
+
+
+@pytest.mark.parametrize('body, error', [
+    ('aspects:\n  Fit:\n', "non-empty list"),
+    ('aspects:\n  Yes: [yes]\n', "must be a string"),
+    ('aspects:\n  Fit: [fit, 3]\n', "non-empty list"),
+    ('aspects: []\n', "'aspects' mapping"),
+])
+def test_invalid_files_are_rejected(tmp_path, body, error):
+    pytest.importorskip('yaml')
+    path = tmp_path / 'earbuds.yaml'
+    path.write_text(body)
+    with pytest.raises(ValueError, match=error):
+        load_taxonomy_file(str(path))
+
+
+def test_bad_file_does_not_block_other_categories(taxonomy_dir):
+    write_taxonomy(taxonomy_dir, 'laptops', {'Keyboard': ['keyboard']})
+    (taxonomy_dir / 'earbuds.json').write_text('{"aspects": {"Fit": null}}')
+
+    taxonomies = reload_taxonomies()
+    assert set(taxonomies) == {'laptops', taxonomy_module.DEFAULT_CATEGORY}
+
+
+def test_broken_edit_keeps_previous_version(taxonomy_dir):
+    path = write_taxonomy(taxonomy_dir, 'earbuds', {'Fit': ['fit']}, mtime=1000)
+    version = reload_taxonomies()['earbuds'].version
+
+    path.write_text('{"aspects": {"Fit": []}}')
+    os.utime(path, (2000, 2000))
+    assert refresh_if_changed() is False
+    assert taxonomy_module.get_taxonomy('earbuds').version == version
+    # The broken file is not parsed again until it changes
+    assert taxonomy_module._signature == taxonomy_module._directory_signature(str(taxonomy_dir))
+
+
+def test_refresh_picks_up_edits(taxonomy_dir):
+    path = write_taxonomy(taxonomy_dir, 'earbuds', {'Fit': ['fit']}, mtime=1000)
+    assert refresh_if_changed() is True
+    assert refresh_if_changed() is False
+
+    write_taxonomy(taxonomy_dir, 'earbuds', {'Fit': ['fit'], 'Sound': ['bass']}, mtime=2000)
+    assert refresh_if_changed() is True
+    assert taxonomy_module.get_taxonomy('earbuds').aspects == ('Fit', 'Sound')
+    assert path.exists()
+
+
+def test_reload_invalidates_cached_aspects(taxonomy_dir):
+    try:
+        from nlp import aspect_extractor
+    except (Exception, SystemExit) as e:  # spaCy model or NLTK data not installed
+        pytest.skip(f"aspect extractor unavailable: {e}")
+
+    write_taxonomy(taxonomy_dir, 'earbuds', {'Fit': ['fit']}, mtime=1000)
+    reload_taxonomies()
+    assert aspect_extractor.extract_aspect('The bass is weak', 'earbuds') == 'Unclassified'
+    old_version = taxonomy_module.get_taxonomy('earbuds').version
+
+    write_taxonomy(taxonomy_dir, 'earbuds', {'Fit': ['fit'], 'Sound': ['bass']}, mtime=2000)
+    reload_taxonomies()
+    assert all(key[0] != old_version for key in aspect_extractor._aspect_cache)
+    assert aspect_extractor.extract_aspect('The bass is weak', 'earbuds') == 'Sound'
+
+
+# --- Columnar analysis results ---
+
+def make_results(rows):
+    text = ''.join(f"Sentence number {i}. " for i in range(rows))
+    results = AnalysisResults(text, ['Battery', 'Camera'])
+    start = 0
+    for i in range(rows):
+        end = text.index('.', start) + 1
+        results.append(start, end, ('Battery', 'Camera', 'Value')[i % 3], (i % 7 - 3) / 3)
+        start = end + 1
+    return results
+
+
+def test_iter_json_parses_across_chunks():
+    results = make_results(2500)
+    chunks = list(results.iter_json(chunk_size=1000))
+    assert len(chunks) == 5  # '[', three chunks of rows, ']'
+
+    rows = json.loads(''.join(chunks))
+    assert len(rows) == 2500
+    assert rows[1234]['sentence'] == "Sentence number 1234."
+    assert rows[1234]['aspect'] == 'Camera'
+    assert rows[0]['polarity'] == {'label': 'NEGATIVE', 'score': 1.0}
+    assert json.loads(''.join(AnalysisResults('').iter_json())) == []
+
+
+def test_to_pandas_shares_memory_with_buffers():
+    results = make_results(10)
+    df = results.to_pandas()
+    assert np.shares_memory(df['polarity'].to_numpy(), results.polarity)
+    assert np.shares_memory(df['start'].to_numpy(), results.starts)
+    assert np.shares_memory(df['aspect'].array.codes, results.aspect_codes)
+    assert list(df['aspect'].cat.categories) == ['Battery', 'Camera', 'Value']
+
+    with_text = results.to_pandas(sentences=True)
+    assert with_text.loc[3, 'sentence'] == "Sentence number 3."
+
+
+def test_append_rejects_more_than_128_aspects():
+    results = AnalysisResults('x')
+    for i in range(128):
+        results.append(0, 1, f"aspect {i}", 0.0)
+    with pytest.raises(ValueError, match='128 aspects'):
+        results.append(0, 1, "one too many", 0.0)
+    assert len(results) == 128
+
+
+def test_append_fails_while_a_view_is_alive():
+    results = make_results(3)
+    polarity = results.polarity
+    with pytest.raises(BufferError):
+        results.append(0, 1, 'Display', 0.5)
+    # The failed append left every column, and the aspects, untouched
+    assert [len(column) for column in (results.starts, results.ends, results.aspect_codes)] == [3, 3, 3]
+    assert results.aspects == ['Battery', 'Camera', 'Value']
+    del polarity
+    results.append(0, 1, 'Display', 0.5)
+    assert len(results) == 4 and len(results.polarity) == 4
+
+
+def test_sentence_spans_round_trip():
+    try:
+        from nlp.preprocessing import get_sentences, get_sentence_spans
+    except (Exception, SystemExit) as e:  # spaCy model not installed
+        pytest.skip(f"preprocessing unavailable: {e}")
+
+    text = "Great battery!  The camera is bad.\nDisplay: fine. Value? Good, really good."
+    try:
+        spans = get_sentence_spans(text)
+    except LookupError as e:  # NLTK punkt data not installed
+        pytest.skip(f"NLTK data unavailable: {e}")
+    assert [text[start:end] for start, end in spans] == get_sentences(text)
+    assert all(end <= start for (_, end), (start, _) in zip(spans, spans[1:]))
@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sentiment import trends
+from sentiment.trends import MemoryTrendStore, MySQLTrendStore, TrendEngine
+
+START = pd.Timestamp('2024-03-01', tz='UTC').timestamp()
+DAY = 24 * 3600
+# Retention is measured from the engine's clock; pretend it is 2024-03-31
+NOW = START + 30 * DAY
+
+
+def clock():
+    return NOW
+
+
+def make_records(days=30, per_day=20, drop_from_day=None):
+    rng = np.random.default_rng(0)
+    created_utc = START + np.repeat(np.arange(days), per_day) * DAY + rng.uniform(0, DAY, days * per_day)
+    polarity = rng.normal(0.5, 0.1, len(created_utc))
+    if drop_from_day is not None:
+        polarity[created_utc >= START + drop_from_day * DAY] -= 1.0
+    return pd.DataFrame({
+        'created_utc': created_utc,
+        'product': 'Galaxy S23',
+        'aspect': 'Battery',
+        'polarity': polarity.clip(-1, 1)
+    })
+
+
+def test_sudden_drop_is_flagged():
+    engine = TrendEngine(clock=clock)
+    engine.add(make_records(drop_from_day=20))
+
+    change_points = engine.get_change_points('day')
+    assert [point['time'][:10] for point in change_points] == ['2024-03-21']
+    assert change_points[0]['aspect'] == 'Battery'
+    assert change_points[0]['polarity'] < change_points[0]['baseline'] - 0.5
+
+
+def test_steady_series_has_no_change_points():
+    engine = TrendEngine(clock=clock)
+    engine.add(make_records())
+    assert engine.get_change_points('day') == []
+    assert len(engine.get_series('day')[0]['points']) == 30
+
+
+def test_incremental_batches_match_single_batch():
+    records = make_records(drop_from_day=20)
+    single = TrendEngine(clock=clock)
+    single.add(records)
+    batched = TrendEngine(clock=clock)
+    for i in range(0, len(records), 100):
+        batched.add(records.iloc[i:i + 100])
+
+    for window in ('hour', 'day', 'week'):
+        expected = single.get_change_points(window)
+        actual = batched.get_change_points(window)
+        assert [(p['time'], p['count']) for p in actual] == [(p['time'], p['count']) for p in expected]
+        assert np.allclose([p['polarity'] for p in actual], [p['polarity'] for p in expected])
+        counts = [[p['count'] for p in s['points']] for s in batched.get_series(window)]
+        assert counts == [[p['count'] for p in s['points']] for s in single.get_series(window)]
+
+
+def test_empty_batch_is_ignored():
+    engine = TrendEngine(clock=clock)
+    engine.add(pd.DataFrame({'created_utc': [START], 'product': ['A'],
+                             'aspect': ['Unclassified'], 'polarity': [0.1]}))
+    engine.add(pd.DataFrame(columns=['created_utc', 'product', 'aspect', 'polarity']))
+    assert engine.get_series('day') == []
+    assert engine.get_change_points('day') == []
+
+
+def test_unobserved_categories_get_no_series():
+    engine = TrendEngine(clock=clock)
+    engine.add(pd.DataFrame({
+        'created_utc': [START],
+        'product': ['A'],
+        'aspect': pd.Categorical(['Battery'], categories=['Battery', 'Camera', 'Display']),
+        'polarity': np.float32([0.5])
+    }))
+    assert [series['aspect'] for series in engine.get_series('day')] == ['Battery']
+
+
+def test_engines_on_one_store_share_trends():
+    store = MemoryTrendStore()
+    writer, reader = TrendEngine(store=store, clock=clock), TrendEngine(store=store, clock=clock)
+    writer.add(make_records(days=3))
+    reader.refresh(force=True)
+    assert reader.get_series('day') == writer.get_series('day')
+
+
+def test_future_dates_do_not_push_out_history():
+    engine = TrendEngine(clock=clock)
+    engine.add(make_records())
+    future = make_records(days=1)
+    future['created_utc'] = pd.Timestamp('2100-01-01', tz='UTC').timestamp()
+    engine.add(future)
+
+    points = engine.get_series('day')[0]['points']
+    assert len(points) == 30
+    assert points[-1]['time'].startswith('2024-03-30')
+
+
+def test_retention_is_measured_from_now():
+    engine = TrendEngine(clock=lambda: NOW + 360 * DAY)
+    engine.add(make_records())
+    # Only the last days of March are within 365 days of the clock
+    assert [p['time'][:10] for p in engine.get_series('day')[0]['points']][:1] == ['2024-03-27']
+    assert engine.get_series('hour') == []
+
+
+def test_product_names_are_validated(monkeypatch):
+    engine = TrendEngine(clock=clock)
+    records = make_records(days=1)
+    with pytest.raises(ValueError, match='at most'):
+        engine.add(records.assign(product='x' * (trends.MAX_PRODUCT_LENGTH + 1)))
+
+    monkeypatch.setattr(trends, 'MAX_PRODUCTS', 2)
+    engine.add(records.assign(product='A'))
+    engine.add(records.assign(product='B'))
+    with pytest.raises(ValueError, match='At most 2 products'):
+        engine.add(records.assign(product='C'))
+    assert {s['product'] for s in engine.get_series('day')} == {'A', 'B'}
+
+
+def test_small_batch_only_updates_its_columns():
+    history = pd.concat([make_records(), make_records().assign(product='Pixel 8')])
+    late = make_records(days=30, per_day=1, drop_from_day=0).iloc[-10:]
+
+    engine = TrendEngine(clock=clock)
+    engine.add(history)
+    before = engine.get_series('day', product='Pixel 8')
+    engine.get_change_points('day')
+    engine.add(late)
+
+    fresh = TrendEngine(clock=clock)
+    fresh.add(pd.concat([history, late]))
+    assert engine.get_series('day') == fresh.get_series('day')
+    assert engine.get_change_points('day') == fresh.get_change_points('day')
+    assert engine.get_series('day', product='Pixel 8') == before
+
+
+class FakeMySQL:
+    """Just enough of a DB-API connection to run MySQLTrendStore's queries."""
+
+    def __init__(self):
+        self.rows = {}
+        self._result = None
+
+    def __call__(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        verb = query.split()[0].upper()
+        if verb == 'SELECT':
+            self._result = [(bucket, product, aspect, polarity_sum, count)
+                            for (window, bucket, product, aspect), (polarity_sum, count) in self.rows.items()
+                            if window == params[0]]
+        elif verb == 'DELETE':
+            window, before = params
+            self.rows = {key: value for key, value in self.rows.items()
+                         if key[0] != window or key[1] >= before}
+
+    def executemany(self, query, params):
+        assert 'ON DUPLICATE KEY UPDATE' in query
+        for window, bucket, product, aspect, polarity_sum, count in params:
+            assert bucket.tzinfo is None
+            assert isinstance(polarity_sum, float) and isinstance(count, int)
+            old_sum, old_count = self.rows.get((window, bucket, product, aspect), (0.0, 0))
+            self.rows[(window, bucket, product, aspect)] = (old_sum + polarity_sum, old_count + count)
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_mysql_store_round_trips_and_prunes():
+    database = FakeMySQL()
+    writer = TrendEngine(store=MySQLTrendStore(database), clock=clock)
+    writer.add(make_records(drop_from_day=20))
+    writer.add(make_records(days=2))
+
+    memory = TrendEngine(clock=clock)
+    memory.add(make_records(drop_from_day=20))
+    memory.add(make_records(days=2))
+
+    reader = TrendEngine(store=MySQLTrendStore(database), clock=clock)
+    assert reader.get_series('day') == memory.get_series('day')
+    assert reader.get_change_points('day') == memory.get_change_points('day')
+
+    # A week later, the first week of hourly buckets falls out of retention
+    later = TrendEngine(store=MySQLTrendStore(database), clock=lambda: NOW + 7 * DAY)
+    later.refresh(force=True)
+    hours = [key[1] for key in database.rows if key[0] == 'hour']
+    assert min(hours) >= pd.Timestamp('2024-03-24').to_pydatetime()
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+try:
+    from web import app as web_app
+except (Exception, SystemExit) as e:  # spaCy model, NLTK data or Flask not installed
+    pytest.skip(f"web app unavailable: {e}", allow_module_level=True)
+
+
+@pytest.fixture
+def warm_up_calls(monkeypatch):
+    """Replaces the real warm-up with a stub that fails until told otherwise."""
+    calls = {'count': 0, 'fail': False}
+
+    def fake_warm_up():
+        calls['count'] += 1
+        try:
+            if calls['fail']:
+                web_app._warmup_error = 'model download failed'
+                web_app._warmup_failed_at = time.monotonic()
+            else:
+                web_app._warmup_error = None
+                web_app._ready.set()
+        finally:
+            web_app._warmup_running = False
+
+    monkeypatch.setattr(web_app, 'warm_up', fake_warm_up)
+    monkeypatch.setattr(web_app, 'refresh_if_changed', lambda: False)
+    monkeypatch.setattr(web_app, 'WARMUP_MODE', 'background')
+    monkeypatch.setattr(web_app, '_ready', web_app.threading.Event())
+    monkeypatch.setattr(web_app, '_warmup_running', False)
+    monkeypatch.setattr(web_app, '_warmup_error', None)
+    monkeypatch.setattr(web_app, '_warmup_failed_at', None)
+    return calls
+
+
+@pytest.fixture
+def client():
+    return web_app.app.test_client()
+
+
+def wait_for_warm_up():
+    # ensure_warm_up runs the stub in a background thread
+    for _ in range(200):
+        if not web_app._warmup_running:
+            return
+        time.sleep(0.01)
+    raise AssertionError("warm-up did not finish")
+
+
+def test_healthz_answers_before_warm_up(warm_up_calls, client):
+    warm_up_calls['fail'] = True
+    assert client.get('/healthz').status_code == 200
+
+
+def test_readyz_turns_ready_after_warm_up(warm_up_calls, client, monkeypatch):
+    # Hold the warm-up back to see the not-ready state
+    monkeypatch.setattr(web_app, '_warmup_running', True)
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'warming_up'
+
+    web_app._warmup_running = False
+    client.get('/healthz')
+    wait_for_warm_up()
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ready'
+    assert warm_up_calls['count'] == 1
+
+
+def test_failed_warm_up_is_reported_and_retried(warm_up_calls, client, monkeypatch):
+    monkeypatch.setattr(web_app, 'WARMUP_RETRY_SECONDS', 60)
+    warm_up_calls['fail'] = True
+    client.get('/healthz')
+    wait_for_warm_up()
+
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'failed', 'error': 'model download failed'}
+    assert warm_up_calls['count'] == 1
+
+    # Once the retry delay has passed, the next request tries again
+    warm_up_calls['fail'] = False
+    web_app._warmup_failed_at -= 60
+    client.get('/healthz')
+    wait_for_warm_up()
+    assert warm_up_calls['count'] == 2
+    assert client.get('/readyz').status_code == 200
+
+
+def test_off_mode_counts_as_ready(warm_up_calls, client, monkeypatch):
+    monkeypatch.setattr(web_app, 'WARMUP_MODE', 'off')
+    assert client.get('/readyz').status_code == 200
+    assert warm_up_calls['count'] == 0
+
+
+@pytest.mark.parametrize('field, value', [
+    ('created_utc', 4102444800),  # 2100-01-01
+    ('created_utc', True),
+    ('created_utc', '1700000000'),
+    ('product', 'x' * 101),
+    ('product', ['Pixel 8']),
+])
+def test_analyze_rejects_bad_trend_fields(warm_up_calls, client, monkeypatch, field, value):
+    monkeypatch.setattr(web_app, 'run_analysis', lambda *args: pytest.fail("analysis should not run"))
+    response = client.post('/analyze', json={'text': 'The battery is great.', 'product': 'Pixel 8',
+                                             field: value})
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+def test_analyze_rejects_non_finite_scores_before_streaming(warm_up_calls, client, monkeypatch):
+    def fake_analysis(text, category=None):
+        results = web_app.AnalysisResults(text, ['Battery'])
+        results.append(0, len(text), 'Battery', float('nan'))
+        return results
+
+    monkeypatch.setattr(web_app, 'run_analysis', fake_analysis)
+    response = client.post('/analyze', json={'text': 'The battery is great.'})
+    assert response.status_code == 500
+    assert 'invalid scores' in response.get_json()['error']
@@ -3,10 +3,15 @@ Flask web application for Aspect-Pulse
 Aspect-Based Sentiment Analysis & Competitive Benchmarking Hub
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
+import numpy as np
+import pandas as pd
 import sys
 import os
 import json
+import math
+import threading
+import time
 from datetime import datetime
 
 # --- Add project root to sys.path ---
@@ -17,9 +22,13 @@ if project_root not in sys.path:
 # ------------------------------------
 
 # --- Import from our project modules ---
-from nlp.preprocessing import get_sentences
-from nlp.aspect_extractor import extract_aspect, ASPECT_KEYWORDS
+from nlp.preprocessing import get_sentences, get_sentence_spans, preprocess_text, nlp
+from nlp.aspect_extractor import extract_aspect
+from nlp.deduplication import deduplicate_text
+from nlp.results import AnalysisResults
+from nlp.taxonomy import get_taxonomy, get_taxonomies, refresh_if_changed
 from sentiment.sentiment_model import get_sentiment_pipeline, get_sentiment
+from sentiment.trends import TrendEngine, get_trend_store, MAX_CLOCK_SKEW_SECONDS, MAX_PRODUCT_LENGTH
 # ---------------------------------------
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
@@ -28,39 +37,119 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
 # Cache for sentiment model
 sentiment_pipeline = None
 
+# Per-product aspect trends. Set ASPECT_PULSE_DB_HOST to keep them in MySQL,
+# shared by all workers and by scrapers/ingest.py; otherwise they only live
+# in this process.
+trend_engine = TrendEngine(store=get_trend_store())
+_model_lock = threading.Lock()
+
+# --- Warm-up ---
+# 'background' warms up in a thread while the server already answers /healthz,
+# 'sync' blocks until warm-up is done (gunicorn.conf.py does this in the
+# master, so workers share the loaded weights), 'off' skips warm-up.
+WARMUP_MODE = os.environ.get('ASPECT_PULSE_WARMUP', 'background')
+# Seconds to wait before retrying a failed warm-up
+WARMUP_RETRY_SECONDS = float(os.environ.get('ASPECT_PULSE_WARMUP_RETRY_SECONDS', 30))
+WARMUP_SENTENCES = [
+    "The battery life is incredible, lasting me two full days.",
+    "I'm really disappointed with the camera quality in low light.",
+    "The screen is bright, but the phone feels slow when gaming.",
+    "For the price, this phone is an absolute steal."
+]
+_ready = threading.Event()
+_warmup_lock = threading.Lock()
+_warmup_running = False
+_warmup_error = None
+_warmup_failed_at = None
+# ---------------
+
 def load_model():
     """Load sentiment model"""
     global sentiment_pipeline
     if sentiment_pipeline is None:
-        sentiment_pipeline = get_sentiment_pipeline()
+        with _model_lock:
+            if sentiment_pipeline is None:
+                sentiment_pipeline = get_sentiment_pipeline()
     return sentiment_pipeline
 
-def run_analysis(raw_text):
+def warm_up():
+    """
+    Loads every model and runs a few dummy batches through the pipeline,
+    so lazy allocations happen before the first real request does.
+    Marks the app as ready when done.
+    """
+    global _warmup_running, _warmup_error, _warmup_failed_at
+    start = time.time()
+    try:
+        model = load_model()
+        if not model:
+            raise RuntimeError("Failed to load sentiment model")
+
+        # NLTK loads punkt, stopwords and WordNet on first use
+        text = ' '.join(WARMUP_SENTENCES)
+        for sentence in get_sentences(text):
+            preprocess_text(sentence)
+
+        # SpaCy and the transformer allocate their buffers on the first batches
+        for batch_size in (1, len(WARMUP_SENTENCES)):
+            list(nlp.pipe(WARMUP_SENTENCES[:batch_size]))
+            model(WARMUP_SENTENCES[:batch_size])
+        for sentence in WARMUP_SENTENCES:
+            extract_aspect(sentence)
+
+        _warmup_error = None
+        _ready.set()
+        print(f"Warm-up finished in {time.time() - start:.1f}s, ready to serve.")
+    except Exception as e:
+        _warmup_error = str(e)
+        _warmup_failed_at = time.monotonic()
+        print(f"Warm-up failed, retrying in {WARMUP_RETRY_SECONDS:.0f}s: {e}")
+    finally:
+        _warmup_running = False
+
+def start_warm_up(mode=WARMUP_MODE):
+    """Start warm-up according to the configured mode, unless it is running or done"""
+    global _warmup_running
+    if mode == 'off':
+        _ready.set()
+        return
+
+    with _warmup_lock:
+        if _ready.is_set() or _warmup_running:
+            return
+        _warmup_running = True
+
+    if mode == 'sync':
+        warm_up()
+    else:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+def run_analysis(raw_text, category=None):
     """
     Runs the full NLP pipeline on a block of raw text.
-    Returns a list of analysis results with aspect and sentiment information.
+    Returns an AnalysisResults container with aspect and sentiment information.
     """
     try:
-        sentences = get_sentences(raw_text)
-        results = []
+        taxonomy = get_taxonomy(category)
+    except KeyError as e:
+        return {"error": str(e.args[0])}
+
+    try:
+        text = deduplicate_text(raw_text)
+        results = AnalysisResults(text, taxonomy.aspects)
         
         model = load_model()
         if not model:
             return {"error": "Failed to load sentiment model"}
 
-        for sentence in sentences:
+        for start, end in get_sentence_spans(text):
+            sentence = text[start:end]
             if len(sentence.strip()) < 3:
                 continue
                 
-            aspect = extract_aspect(sentence)
+            aspect = extract_aspect(sentence, taxonomy.name)
             if aspect != 'Unclassified':
-                polarity = get_sentiment(sentence, model)
-                results.append({
-                    'sentence': sentence,
-                    'aspect': aspect,
-                    'polarity': polarity,
-                    'score': polarity.get('score', 0)
-                })
+                results.append(start, end, aspect, get_sentiment(sentence, model))
 
         return results
     except Exception as e:
@@ -73,28 +162,62 @@ def aggregate_results(results):
     if isinstance(results, dict) and 'error' in results:
         return results
     
+    codes = results.aspect_codes
+    negative = results.polarity < 0
+    num_aspects = len(results.aspects)
+    totals = np.bincount(codes, minlength=num_aspects)
+    negatives = np.bincount(codes[negative], minlength=num_aspects)
+
     aggregated = {}
-    sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-    
-    for result in results:
-        aspect = result['aspect']
-        sentiment = result['polarity'].get('label', 'neutral').lower()
-        
-        if aspect not in aggregated:
-            aggregated[aspect] = {'positive': 0, 'negative': 0, 'neutral': 0, 'total': 0}
-        
-        aggregated[aspect][sentiment] += 1
-        aggregated[aspect]['total'] += 1
-        sentiment_counts[sentiment] += 1
+    for code, aspect in enumerate(results.aspects):
+        if totals[code]:
+            aggregated[aspect] = {
+                'positive': int(totals[code] - negatives[code]),
+                'negative': int(negatives[code]),
+                'neutral': 0,
+                'total': int(totals[code])
+            }
     
     return {
         'by_aspect': aggregated,
-        'overall_sentiment': sentiment_counts,
+        'overall_sentiment': {
+            'positive': int(len(results) - negative.sum()),
+            'negative': int(negative.sum()),
+            'neutral': 0
+        },
         'total_sentences': len(results)
     }
 
+def record_trends(results, product, created_utc=None):
+    """
+    Feed analysis results into the trend engine under a product name,
+    dated created_utc (epoch seconds), or now if the text has no date.
+    """
+    if created_utc is None:
+        created_utc = time.time()
+    trend_engine.add(pd.DataFrame({
+        'created_utc': np.full(len(results), created_utc),
+        'product': product,
+        'aspect': pd.Categorical.from_codes(results.aspect_codes, categories=results.aspects),
+        'polarity': results.polarity
+    }))
+
 # --- Routes ---
 
+@app.before_request
+def ensure_warm_up():
+    """Start warm-up on the first request if nothing did, and retry it after a failure"""
+    if _ready.is_set() or _warmup_running:
+        return
+    if _warmup_failed_at is None or time.monotonic() - _warmup_failed_at >= WARMUP_RETRY_SECONDS:
+        # Never block a request on warm-up
+        start_warm_up('off' if WARMUP_MODE == 'off' else 'background')
+
+@app.before_request
+def refresh_taxonomies():
+    """Pick up edited taxonomy files without restarting the worker"""
+    refresh_if_changed()
+
 @app.route('/')
 def index():
     """Home page"""
@@ -112,20 +235,49 @@ def analyze():
         
         if len(text) > 5000:
             return jsonify({'error': 'Text is too long (max 5000 characters)'}), 400
+
+        product = data.get('product')
+        if product and (not isinstance(product, str) or len(product.strip()) > MAX_PRODUCT_LENGTH):
+            return jsonify({'error': f'product must be a string of at most {MAX_PRODUCT_LENGTH} characters'}), 400
+        product = product.strip() if product else None
+
+        # A date in the future would sit at the end of every trend window
+        created_utc = data.get('created_utc')
+        if created_utc is not None and (
+                isinstance(created_utc, bool) or not isinstance(created_utc, (int, float))
+                or not math.isfinite(created_utc) or created_utc > time.time() + MAX_CLOCK_SKEW_SECONDS):
+            return jsonify({'error': 'created_utc must be a Unix timestamp in seconds, not in the future'}), 400
         
-        results = run_analysis(text)
+        results = run_analysis(text, data.get('category'))
         
         if isinstance(results, dict) and 'error' in results:
             return jsonify(results), 400
-        
+
+        # Once streaming starts the status is sent, so catch scores that
+        # would not serialize to valid JSON here
+        if not np.isfinite(results.polarity).all():
+            return jsonify({'error': 'Analysis failed: the sentiment model returned invalid scores'}), 500
+
         aggregated = aggregate_results(results)
+
+        if product and results:
+            try:
+                record_trends(results, product, created_utc)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'success': True,
-            'results': results,
-            'summary': aggregated,
-            'timestamp': datetime.now().isoformat()
-        })
+        # Stream the per-sentence results instead of building one dict each
+        head = '{"success": true, "results": '
+        tail = ', "summary": %s, "timestamp": %s}' % (
+            json.dumps(aggregated), json.dumps(datetime.now().isoformat())
+        )
+
+        def generate():
+            yield head
+            yield from results.iter_json()
+            yield tail
+
+        return Response(generate(), mimetype='application/json')
     
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
@@ -143,11 +295,53 @@ def about():
 @app.route('/api/aspects')
 def get_aspects():
     """API endpoint to get available aspects"""
+    try:
+        taxonomy = get_taxonomy(request.args.get('category'))
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+
     return jsonify({
-        'aspects': list(ASPECT_KEYWORDS.keys()),
+        'aspects': list(taxonomy.aspects),
+        'category': taxonomy.name,
+        'categories': sorted(get_taxonomies()),
+        'version': taxonomy.version,
         'description': 'List of product aspects that can be analyzed'
     })
 
+@app.route('/api/trends')
+def get_trends():
+    """API endpoint for precomputed per-aspect sentiment trends"""
+    window = request.args.get('window', 'day')
+    product = request.args.get('product')
+    aspect = request.args.get('aspect')
+    try:
+        series = trend_engine.get_series(window, product, aspect)
+        change_points = trend_engine.get_change_points(window, product, aspect)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'window': window,
+        'series': series,
+        'change_points': change_points
+    })
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and answering requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: models are loaded and warmed up"""
+    if _ready.is_set():
+        return jsonify({'status': 'ready'})
+
+    body = {'status': 'warming_up'}
+    if _warmup_error:
+        body = {'status': 'failed', 'error': _warmup_error}
+    return jsonify(body), 503
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -159,4 +353,8 @@ def server_error(error):
     return render_template('500.html'), 500
 
 if __name__ == '__main__':
+    # With debug=True the reloader re-runs this script in a child process that
+    # serves the requests; only warm up there, not in the file watcher.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,45 @@
+"""
+Gunicorn configuration for Aspect-Pulse.
+
+Usage (from the web/ directory):
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is imported and warmed up once in the master process before the
+workers are forked, so every worker shares the read-only model weights
+through copy-on-write instead of loading its own copy.
+"""
+
+import gc
+import os
+
+# Tokenizer threads started in the master do not survive a fork
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+preload_app = True
+# Model loading happens in the master, but give slow first requests some slack
+timeout = 120
+
+
+def when_ready(server):
+    # Runs in the master after the app is preloaded and before any worker is
+    # forked. A background warm-up thread would not be copied into the
+    # workers, so warm-up always runs synchronously here unless it is off.
+    from app import start_warm_up
+
+    if not os.environ.get('ASPECT_PULSE_DB_HOST') and server.cfg.workers > 1:
+        server.log.warning("ASPECT_PULSE_DB_HOST is not set: each of the %d workers keeps its own "
+                           "in-memory trends, so /api/trends depends on which worker answers",
+                           server.cfg.workers)
+
+    mode = os.environ.get('ASPECT_PULSE_WARMUP', 'sync')
+    if mode not in ('sync', 'off'):
+        server.log.warning("ASPECT_PULSE_WARMUP=%s does not work with preload_app, using 'sync'", mode)
+        mode = 'sync'
+    start_warm_up(mode)
+
+    # Move everything loaded so far out of the garbage collector's reach.
+    # Otherwise each GC pass in a worker writes to the shared objects and
+    # copies their memory pages.
+    gc.freeze()